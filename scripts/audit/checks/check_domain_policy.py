@@ -11,14 +11,19 @@ Canonical domain: insightpulseai.com
 Mailgun subdomain: mg.insightpulseai.com
 """
 
+import base64
+import json
+import mmap
 import os
 import re
 import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from scripts.audit.lib import ok, fail, run_cmd
+from scripts.audit.lib import ok, fail, run_cmd_stream
 
 
 # Forbidden patterns - these should NEVER appear in the codebase
@@ -26,6 +31,9 @@ FORBIDDEN_PATTERNS = [
     r"insightpulseai\.net",
 ]
 
+# Compiled forms, used to attribute each match to its pattern(s)
+_FORBIDDEN_RES = tuple((p, re.compile(p)) for p in FORBIDDEN_PATTERNS)
+
 # Excluded paths (already handled by ripgrep defaults, but explicit here)
 EXCLUDED_PATHS = [
     ".git",
@@ -40,6 +48,63 @@ EXCLUDED_PATHS = [
     "*.pyc",
 ]
 
+# Invariant ripgrep arguments (mirrors EXCLUDED_PATHS plus compiled artifacts)
+# --hidden: search hidden files
+# --no-ignore-vcs: don't respect .gitignore (we want to catch everything)
+# --json: line-delimited JSON events (path, line number, line text)
+_RG_BASE_ARGS = (
+    "rg",
+    "--json",
+    "--hidden",
+    "--no-ignore-vcs",
+    "--glob", "!.git/**",
+    "--glob", "!node_modules/**",
+    "--glob", "!.venv/**",
+    "--glob", "!venv/**",
+    "--glob", "!dist/**",
+    "--glob", "!build/**",
+    "--glob", "!.next/**",
+    "--glob", "!__pycache__/**",
+    "--glob", "!*.pyc",
+    "--glob", "!*.pyo",
+    "--glob", "!*.so",
+    "--glob", "!*.dylib",
+)
+
+# One "-e" per pattern so a single ripgrep run covers them all
+_RG_PATTERN_ARGS = tuple(arg for p in FORBIDDEN_PATTERNS for arg in ("-e", p))
+
+# Built-in scanner exclusions (used when ripgrep is not installed)
+_NATIVE_SKIP_DIRS = frozenset(p for p in EXCLUDED_PATHS if "*" not in p)
+_NATIVE_SKIP_SUFFIXES = (".pyc", ".pyo", ".so", ".dylib")
+
+# Maximum number of violations reported (the scan stops once reached)
+MAX_VIOLATIONS = 50
+
+
+# Meta-reference patterns (policy documentation, not actual usages), compiled
+# once at import. The original "keyword.*insightpulseai\.net" forms backtrack
+# quadratically on long lines, so the keyword and the domain are located
+# separately: a keyword only has to end before the *last* domain occurrence
+# ("forbidden" only has to start after the *first*), which is linear.
+_META_DIRECT_RE = re.compile(
+    r"no\s+insightpulseai\.net"           # "no insightpulseai.net references"
+    r"|insightpulseai\\\.net",             # Escaped regex pattern
+    re.IGNORECASE
+)
+_META_KEYWORD_RE = re.compile(
+    r"forbidden"                           # "forbidden domain 'insightpulseai.net'"
+    r"|checking"                           # "Checking for insightpulseai.net"
+    r"|block"                              # "block .net references"
+    r"|ensure"                             # "Ensures no insightpulseai.net"
+    r"|FAIL"                               # Test expectations
+    r"|pattern"                            # Pattern definitions
+    r"|policy",                            # Policy descriptions
+    re.IGNORECASE
+)
+_META_SUFFIX_RE = re.compile(r"forbidden", re.IGNORECASE)  # "insightpulseai.net is forbidden"
+_DOMAIN_RE = re.compile(r"insightpulseai\.net", re.IGNORECASE)
+
 
 def is_policy_meta_reference(line: str) -> bool:
     """
@@ -48,24 +113,135 @@ def is_policy_meta_reference(line: str) -> bool:
 
     Lines like "no insightpulseai.net references" or "Checking for insightpulseai.net"
     are descriptions of what we're looking for, not actual usages.
+
+    The literal prefilter is case-sensitive, matching the ripgrep scan: lines
+    without a lowercase "insightpulseai" are never hits, so they are rejected
+    without allocating a lowered copy or entering the regex engine.
+    """
+    if "insightpulseai" not in line:
+        return False
+    if _META_DIRECT_RE.search(line):
+        return True
+    if "\n" in line:
+        # Keyword and domain must share a line (as "." never matched "\n")
+        return any(_has_meta_keyword(part) for part in line.split("\n"))
+    return _has_meta_keyword(line)
+
+
+def _has_meta_keyword(line: str) -> bool:
+    """Check for a policy keyword before, or "forbidden" after, the domain."""
+    domains = list(_DOMAIN_RE.finditer(line))
+    if not domains:
+        return False
+    if _META_SUFFIX_RE.search(line, domains[0].end()):
+        return True
+    return _META_KEYWORD_RE.search(line, 0, domains[-1].start()) is not None
+
+
+def _rg_text(field: dict) -> str:
+    """Decode a ripgrep JSON text field (non-UTF-8 data arrives as base64)."""
+    if "text" in field:
+        return field["text"]
+    return base64.b64decode(field.get("bytes", "")).decode("utf-8", "replace")
+
+
+def _parse_rg_match(event_line: str) -> Optional[Tuple[str, int, str]]:
     """
-    meta_patterns = [
-        r"no\s+insightpulseai\.net",           # "no insightpulseai.net references"
-        r"forbidden.*insightpulseai\.net",      # "forbidden domain 'insightpulseai.net'"
-        r"checking.*insightpulseai\.net",       # "Checking for insightpulseai.net"
-        r"insightpulseai\.net.*forbidden",      # "insightpulseai.net is forbidden"
-        r"block.*insightpulseai\.net",          # "block .net references"
-        r"ensure.*insightpulseai\.net",         # "Ensures no insightpulseai.net"
-        r"insightpulseai\\\.net",               # Escaped regex pattern
-        r"FAIL.*insightpulseai\.net",           # Test expectations
-        r"pattern.*insightpulseai\.net",        # Pattern definitions
-        r"policy.*insightpulseai\.net",         # Policy descriptions
-    ]
-    line_lower = line.lower()
-    for mp in meta_patterns:
-        if re.search(mp, line_lower, re.IGNORECASE):
-            return True
-    return False
+    Parse one line of `rg --json` output.
+
+    Returns (path, line_number, line_text) for match events, None otherwise.
+    """
+    event = json.loads(event_line)
+    if event.get("type") != "match":
+        return None
+    data = event["data"]
+    return (
+        _rg_text(data["path"]),
+        data["line_number"],
+        _rg_text(data["lines"]).rstrip("\r\n"),
+    )
+
+
+def _scan_file(path: str, regex: "re.Pattern[bytes]") -> Iterator[Tuple[int, str]]:
+    """
+    Yield (line_number, line_text) for each line of a file matching regex.
+
+    The file is memory-mapped and searched in place. Empty and binary files
+    (NUL byte in the first 8 KiB, as ripgrep does) are skipped.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                if m.find(b"\0", 0, 8192) != -1:
+                    return
+                line_number = 1
+                counted = 0
+                pos = 0
+                while pos <= len(m):
+                    match = regex.search(m, pos)
+                    if match is None:
+                        return
+                    start = m.rfind(b"\n", 0, match.start()) + 1
+                    end = m.find(b"\n", match.start())
+                    if end == -1:
+                        end = len(m)
+                    line_number += m[counted:start].count(b"\n")
+                    counted = start
+                    yield line_number, m[start:end].decode("utf-8", "replace").rstrip("\r")
+                    pos = end + 1
+    except (OSError, ValueError):
+        return
+
+
+def _scan_native(
+    patterns: List[str],
+    line_handler: Callable[[str, int, str], bool],
+    timeout: int = 60
+) -> Dict[str, Any]:
+    """
+    Scan the working tree for any of the patterns without ripgrep.
+
+    Walks the tree with os.scandir (skipping EXCLUDED_PATHS, compiled
+    artifacts, symlinks and non-regular files such as FIFOs) and passes
+    each matching line to line_handler, which returns True to stop the scan.
+    The timeout is checked between files.
+
+    Returns:
+        Dict with success and returncode (0 = matches, 1 = none, -1 =
+        timed out, as run_cmd_stream)
+    """
+    regex = re.compile("|".join(f"(?:{p})" for p in patterns).encode())
+    deadline = time.monotonic() + timeout
+    found = False
+    dirs = ["."]
+    while dirs:
+        try:
+            entries = os.scandir(dirs.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir():
+                    if entry.name not in _NATIVE_SKIP_DIRS:
+                        dirs.append(entry.path)
+                elif (entry.is_file(follow_symlinks=False)
+                      and not entry.name.endswith(_NATIVE_SKIP_SUFFIXES)):
+                    if time.monotonic() > deadline:
+                        return {
+                            "success": False,
+                            "returncode": -1,
+                            "stderr": f"Scan timed out after {timeout}s",
+                            "error": "timeout"
+                        }
+                    for line_number, text in _scan_file(entry.path, regex):
+                        found = True
+                        if line_handler(entry.path, line_number, text):
+                            return {"success": True, "returncode": 0, "terminated": True}
+    return {"success": found, "returncode": 0 if found else 1}
 
 
 def run():
@@ -76,86 +252,54 @@ def run():
     Meta-references (policy documentation) are excluded.
     This is a hard policy check that blocks CI.
     """
-    results = []
-
-    for pattern in FORBIDDEN_PATTERNS:
-        # Use ripgrep for fast searching
-        # --hidden: search hidden files
-        # --no-ignore-vcs: don't respect .gitignore (we want to catch everything)
-        # -n: show line numbers
-        # -l: only show filenames (for counting)
-        cmd = [
-            "rg",
-            "-n",
-            "--hidden",
-            "--no-ignore-vcs",
-            "--glob", "!.git/**",
-            "--glob", "!node_modules/**",
-            "--glob", "!.venv/**",
-            "--glob", "!venv/**",
-            "--glob", "!dist/**",
-            "--glob", "!build/**",
-            "--glob", "!.next/**",
-            "--glob", "!__pycache__/**",
-            "--glob", "!*.pyc",
-            "--glob", "!*.pyo",
-            "--glob", "!*.so",
-            "--glob", "!*.dylib",
-            pattern,
-            "."
-        ]
-
-        result = run_cmd(cmd, timeout=60)
-
-        # ripgrep returns exit code 1 if no matches (which is what we want)
-        if result["returncode"] == 0 and result["stdout"]:
-            # Filter out meta-references (policy documentation)
-            raw_matches = result["stdout"].strip().split("\n")
-            real_violations = []
-
-            for match in raw_matches:
-                if not is_policy_meta_reference(match):
-                    real_violations.append(match)
-
-            if real_violations:
-                # Limit to first 50 matches to avoid huge output
-                violations = real_violations[:50]
-
-                return fail("forbidden_domain_found", {
-                    "pattern": pattern,
-                    "match_count": len(violations),
-                    "matches": violations,
-                    "message": (
-                        f"Found {len(violations)} actual usage(s) of forbidden domain pattern "
-                        f"'{pattern}'. All references must use 'insightpulseai.com'."
-                    ),
-                    "fix": (
-                        "Run: find . -type f -not -path '*/.git/*' -print0 | "
-                        "xargs -0 perl -pi -e 's/insightpulseai\\.net/insightpulseai.com/g'"
-                    )
-                })
-
-        # Check if ripgrep itself failed (not just "no matches")
-        if result["returncode"] not in [0, 1]:
-            # Error running ripgrep
-            results.append({
-                "pattern": pattern,
-                "status": "error",
-                "error": result.get("stderr", "Unknown error")
-            })
-        else:
-            # No matches found - good!
-            results.append({
-                "pattern": pattern,
-                "status": "clean"
-            })
-
-    # Check if we had any errors
-    errors = [r for r in results if r.get("status") == "error"]
-    if errors:
+    # Use ripgrep for fast searching: all patterns in one traversal
+    cmd = [*_RG_BASE_ARGS, *_RG_PATTERN_ARGS, "."]
+
+    # Stream matches and stop ripgrep once enough real violations are seen
+    violations = []
+    matched_patterns = set()
+
+    def collect(path: str, line_number: int, text: str) -> bool:
+        # Filter out meta-references (policy documentation)
+        if not is_policy_meta_reference(text):
+            violations.append(f"{path}:{line_number}:{text}")
+            matched_patterns.update(p for p, r in _FORBIDDEN_RES if r.search(text))
+        return len(violations) >= MAX_VIOLATIONS
+
+    def collect_rg(event_line: str) -> bool:
+        match = _parse_rg_match(event_line)
+        return match is not None and collect(*match)
+
+    result = run_cmd_stream(cmd, collect_rg, timeout=60)
+    if result.get("error") == "command_not_found":
+        # ripgrep is not installed: fall back to the built-in scanner
+        result = _scan_native(FORBIDDEN_PATTERNS, collect, timeout=60)
+
+    if violations:
+        pattern = ", ".join(p for p in FORBIDDEN_PATTERNS if p in matched_patterns)
+        return fail("forbidden_domain_found", {
+            "pattern": pattern,
+            "match_count": len(violations),
+            "matches": violations,
+            "message": (
+                f"Found {len(violations)} actual usage(s) of forbidden domain pattern "
+                f"'{pattern}'. All references must use 'insightpulseai.com'."
+            ),
+            "fix": (
+                "Run: find . -type f -not -path '*/.git/*' -print0 | "
+                "xargs -0 perl -pi -e 's/insightpulseai\\.net/insightpulseai.com/g'"
+            )
+        })
+
+    # Check if ripgrep itself failed (not just "no matches")
+    if result["returncode"] not in [0, 1]:
         # Ripgrep errors - warn but don't fail
         return fail("domain_check_error", {
-            "errors": errors,
+            "errors": [{
+                "patterns": FORBIDDEN_PATTERNS,
+                "status": "error",
+                "error": result.get("stderr", "Unknown error")
+            }],
             "message": "Could not complete domain policy scan"
         })
 
@@ -169,6 +313,5 @@ def run():
 
 
 if __name__ == "__main__":
-    import json
     result = run()
     print(json.dumps(result, indent=2))
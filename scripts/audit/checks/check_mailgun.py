@@ -13,7 +13,10 @@ This check validates:
 import os
 import sys
 import re
-import base64
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -21,7 +24,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from scripts.audit.lib import (
     ok, fail, warn, skip, redact,
     http_get, run_cmd, dig_txt, dig_mx,
-    has_secret, get_secret
+    has_secret, get_secret, get_env_float
 )
 
 
@@ -33,6 +36,103 @@ EXPECTED_MG_DOMAIN = os.getenv("EXPECTED_MG_DOMAIN", f"mg.{ROOT_DOMAIN}").strip(
 ZOHO_MX_RECORDS = ["mx.zoho.com", "mx2.zoho.com", "mx3.zoho.com"]
 REQUIRED_SPF_INCLUDES = ["include:zohomail.com", "include:mailgun.org"]
 
+# All required includes matched in one pass over the SPF record. The lookahead
+# tries every position but captures only the longest include starting there,
+# so each include also reports the required includes that are its prefixes
+# (as an Aho-Corasick output set does).
+_SPF_INCLUDES_RE = re.compile("(?=({}))".format("|".join(
+    re.escape(inc) for inc in sorted(REQUIRED_SPF_INCLUDES, key=len, reverse=True)
+)))
+_SPF_INCLUDE_OUTPUTS = {
+    inc: {p for p in REQUIRED_SPF_INCLUDES if inc.startswith(p)}
+    for inc in REQUIRED_SPF_INCLUDES
+}
+
+# Mailgun API result cache (success flag + status code only, never the key)
+API_CACHE_TTL = get_env_float("AUDIT_MAILGUN_TTL", 300)
+API_CACHE_PATH = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "odoo-kit",
+    "mailgun.json"
+)
+
+
+def _load_api_cache():
+    """Load the on-disk API result cache, or an empty one if unreadable."""
+    try:
+        with open(API_CACHE_PATH) as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_api_cache(cache):
+    """Write the API result cache atomically, readable only by the owner."""
+    try:
+        os.makedirs(os.path.dirname(API_CACHE_PATH), mode=0o700, exist_ok=True)
+        tmp_path = f"{API_CACHE_PATH}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, API_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def _is_fresh(entry, now):
+    """Check if a cache entry is well-formed and within API_CACHE_TTL."""
+    return (
+        isinstance(entry, dict)
+        and isinstance(entry.get("ts"), (int, float))
+        and now - entry["ts"] < API_CACHE_TTL
+    )
+
+
+def _is_conclusive(status_code):
+    """Check if an API status code is stable enough to cache."""
+    return status_code is not None and (200 <= status_code < 300 or status_code in (401, 404))
+
+
+def check_mailgun_api(domain, api_key):
+    """
+    GET the Mailgun domain, reusing a result cached within API_CACHE_TTL.
+
+    Only conclusive answers (2xx, 401, 404) are cached; rate limits, server
+    errors and network failures are always re-checked. Entries are keyed
+    by a hash of domain and API key so a rotated key is checked afresh.
+    """
+    cache_key = hashlib.sha256(f"{domain}:{api_key}".encode()).hexdigest()
+    cache = _load_api_cache() if API_CACHE_TTL > 0 else {}
+    now = time.time()
+
+    entry = cache.get(cache_key)
+    if _is_fresh(entry, now):
+        return {
+            "success": entry.get("success", False),
+            "status_code": entry.get("status_code"),
+            "error": entry.get("error"),
+            "cached": True
+        }
+
+    response = http_get(
+        f"https://api.mailgun.net/v3/{domain}",
+        auth=("api", api_key),
+        timeout=10
+    )
+
+    if API_CACHE_TTL > 0 and _is_conclusive(response.get("status_code")):
+        cache = {k: v for k, v in cache.items() if _is_fresh(v, now)}
+        cache[cache_key] = {
+            "ts": now,
+            "success": response["success"],
+            "status_code": response["status_code"],
+            "error": response.get("error")
+        }
+        _save_api_cache(cache)
+
+    return response
+
 
 def run():
     """Execute Mailgun + Zoho coexistence checks."""
@@ -55,10 +155,17 @@ def run():
     else:
         results.append(("mailgun_domain", "skip", "MAILGUN_DOMAIN not set"))
 
+    # Independent DNS lookups run concurrently; results are read in check order
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        mx_future = pool.submit(dig_mx, ROOT_DOMAIN)
+        root_spf_future = pool.submit(dig_txt, ROOT_DOMAIN)
+        dmarc_future = pool.submit(dig_txt, f"_dmarc.{ROOT_DOMAIN}")
+        mg_spf_future = pool.submit(dig_txt, EXPECTED_MG_DOMAIN)
+
     # =========================================================================
     # Check 2: Root MX must be Zoho
     # =========================================================================
-    mx_records = dig_mx(ROOT_DOMAIN).lower()
+    mx_records = mx_future.result().lower()
 
     if not mx_records:
         results.append(("root_mx", "warn", "Could not query MX records"))
@@ -78,7 +185,7 @@ def run():
     # =========================================================================
     # Check 3: Root SPF must include both Zoho and Mailgun
     # =========================================================================
-    root_spf = dig_txt(ROOT_DOMAIN)
+    root_spf = root_spf_future.result()
 
     if "v=spf1" not in root_spf:
         return warn("spf_missing", {
@@ -87,10 +194,10 @@ def run():
             "message": "Root domain has no SPF record"
         })
 
-    missing_includes = []
-    for inc in REQUIRED_SPF_INCLUDES:
-        if inc not in root_spf:
-            missing_includes.append(inc)
+    found_includes = set()
+    for inc in _SPF_INCLUDES_RE.findall(root_spf):
+        found_includes |= _SPF_INCLUDE_OUTPUTS[inc]
+    missing_includes = [inc for inc in REQUIRED_SPF_INCLUDES if inc not in found_includes]
 
     if missing_includes:
         return warn("spf_missing_includes", {
@@ -105,7 +212,7 @@ def run():
     # =========================================================================
     # Check 4: DMARC record must exist
     # =========================================================================
-    dmarc = dig_txt(f"_dmarc.{ROOT_DOMAIN}")
+    dmarc = dmarc_future.result()
 
     if "v=DMARC1" not in dmarc:
         return warn("dmarc_missing", {
@@ -119,7 +226,7 @@ def run():
     # =========================================================================
     # Check 5: Subdomain SPF must include Mailgun
     # =========================================================================
-    mg_spf = dig_txt(EXPECTED_MG_DOMAIN)
+    mg_spf = mg_spf_future.result()
 
     if "v=spf1" not in mg_spf:
         return warn("mg_spf_missing", {
@@ -150,12 +257,7 @@ def run():
         })
 
     # Validate API access
-    auth_header = base64.b64encode(f"api:{api_key}".encode()).decode()
-    response = http_get(
-        f"https://api.mailgun.net/v3/{domain}",
-        headers={"Authorization": f"Basic {auth_header}"},
-        timeout=10
-    )
+    response = check_mailgun_api(domain, api_key)
 
     if not response["success"]:
         if response["status_code"] == 401:
@@ -176,7 +278,7 @@ def run():
                 "error": response.get("error", "Unknown error")
             })
 
-    results.append(("mailgun_api", "ok", domain))
+    results.append(("mailgun_api", "ok (cached)" if response.get("cached") else "ok", domain))
 
     # All checks passed
     return ok("mailgun_full_check_passed", {
@@ -188,6 +290,5 @@ def run():
 
 
 if __name__ == "__main__":
-    import json
     result = run()
     print(json.dumps(result, indent=2))
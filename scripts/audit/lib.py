@@ -3,13 +3,26 @@ Platform Kit Integration Audit Library
 Core utilities for integration health checks.
 """
 
+import base64
+import functools
+import http.client
 import json
 import os
 import re
 import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
 import urllib.request
-import urllib.error
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Optional: resolve DNS in-process instead of forking `dig` per query
+try:
+    import dns.exception
+    import dns.resolver
+except ImportError:
+    dns = None
 
 
 # =============================================================================
@@ -56,13 +69,21 @@ def skip(code: str, reason: str) -> Dict[str, Any]:
 # Security Helpers
 # =============================================================================
 
+# Preallocated mask; slicing it avoids building a new "*" run per call
+_MASK = "*" * 64
+
+
 def redact(value: str, visible_chars: int = 4) -> str:
     """Redact a secret, showing only the last N characters."""
     if not value:
         return "<empty>"
-    if len(value) <= visible_chars:
-        return "*" * len(value)
-    return "*" * (len(value) - visible_chars) + value[-visible_chars:]
+    length = len(value)
+    if length <= visible_chars:
+        return _MASK[:length] if length <= len(_MASK) else "*" * length
+    masked = length - visible_chars
+    if masked > len(_MASK):
+        return "*" * masked + value[-visible_chars:]
+    return _MASK[:masked] + value[-visible_chars:]
 
 
 def has_secret(name: str) -> bool:
@@ -75,6 +96,14 @@ def get_secret(name: str, default: str = "") -> str:
     return os.getenv(name, default).strip()
 
 
+def get_env_float(name: str, default: float) -> float:
+    """Get a numeric environment variable, returning default if unset or malformed."""
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
 # =============================================================================
 # Command Execution
 # =============================================================================
@@ -145,173 +174,417 @@ def run_cmd(
         }
 
 
-# =============================================================================
-# HTTP Helpers
-# =============================================================================
-
-def http_get(
-    url: str,
-    headers: Optional[Dict[str, str]] = None,
-    timeout: int = 10
+def run_cmd_stream(
+    cmd: List[str],
+    line_handler: Callable[[str], Optional[bool]],
+    timeout: int = 30
 ) -> Dict[str, Any]:
     """
-    Make an HTTP GET request.
+    Run a command, passing each stdout line to a handler as it is produced.
+
+    Output is never buffered in full. If the handler returns a truthy value
+    the process is terminated and no further lines are read.
+
+    Args:
+        cmd: Command as list of strings
+        line_handler: Called with each stdout line (without trailing newline);
+            return True to stop reading
+        timeout: Timeout in seconds
 
     Returns:
-        Dict with success, status_code, body, error
+        Dict with stdout (always None), stderr, returncode, success, terminated
     """
-    req = urllib.request.Request(url, method="GET")
-    if headers:
-        for key, value in headers.items():
-            req.add_header(key, value)
-
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            body = resp.read().decode("utf-8")
+        with tempfile.TemporaryFile(mode="w+") as err:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=err,
+                text=True,
+                errors="replace"
+            )
+            timed_out = threading.Event()
+
+            def _kill() -> None:
+                timed_out.set()
+                proc.kill()
+
+            timer = threading.Timer(timeout, _kill)
+            timer.start()
+            terminated = False
+            try:
+                for line in proc.stdout:
+                    if line_handler(line.rstrip("\n")):
+                        terminated = True
+                        proc.terminate()
+                        break
+                proc.stdout.close()
+                proc.wait()
+            finally:
+                timer.cancel()
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+            err.seek(0)
+            stderr = err.read()
+
+        if timed_out.is_set():
             return {
-                "success": True,
-                "status_code": resp.status,
-                "body": body,
-                "headers": dict(resp.headers)
+                "success": False,
+                "returncode": -1,
+                "stdout": None,
+                "stderr": f"Command timed out after {timeout}s",
+                "error": "timeout"
             }
-    except urllib.error.HTTPError as e:
         return {
-            "success": False,
-            "status_code": e.code,
-            "body": e.read().decode("utf-8") if e.fp else None,
-            "error": str(e)
+            "success": terminated or proc.returncode == 0,
+            "returncode": proc.returncode,
+            "stdout": None,
+            "stderr": stderr,
+            "terminated": terminated
         }
-    except urllib.error.URLError as e:
+    except FileNotFoundError as e:
         return {
             "success": False,
-            "status_code": None,
-            "body": None,
-            "error": str(e.reason)
+            "returncode": -1,
+            "stdout": None,
+            "stderr": str(e),
+            "error": "command_not_found"
         }
     except Exception as e:
         return {
             "success": False,
-            "status_code": None,
-            "body": None,
-            "error": str(e)
+            "returncode": -1,
+            "stdout": None,
+            "stderr": str(e),
+            "error": "exception"
         }
 
 
-def http_post(
+# =============================================================================
+# HTTP Helpers
+# =============================================================================
+
+# Keep-alive connections, one pool per thread (http.client is not thread-safe)
+_http_local = threading.local()
+
+# Methods that may be resent safely if a reused connection was dropped
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def _proxy_for(scheme: str, host: str) -> Optional[urllib.parse.SplitResult]:
+    """Return the proxy to use for a host (HTTP(S)_PROXY / NO_PROXY), if any."""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    if "://" not in proxy:
+        proxy = f"http://{proxy}"
+    return urllib.parse.urlsplit(proxy)
+
+
+def _get_connection(
+    scheme: str,
+    netloc: str,
+    timeout: int
+) -> Tuple[http.client.HTTPConnection, Optional[Dict[str, str]]]:
+    """
+    Return a pooled connection for (scheme, host:port), creating it if needed.
+
+    HTTPS through a proxy is tunnelled with CONNECT. Plain HTTP through a
+    proxy is forwarded: the second element is then the extra headers to send,
+    and the request target must be the absolute URL. It is None otherwise.
+    """
+    pool = getattr(_http_local, "pool", None)
+    if pool is None:
+        pool = _http_local.pool = {}
+
+    proxy = _proxy_for(scheme, urllib.parse.urlsplit(f"//{netloc}").hostname or "")
+    proxy_headers = {}
+    if proxy is not None and proxy.username:
+        credentials = (urllib.parse.unquote(proxy.username), urllib.parse.unquote(proxy.password or ""))
+        proxy_headers["Proxy-Authorization"] = _basic_auth_header(*credentials)
+
+    key = (scheme, netloc, proxy.netloc if proxy else None)
+    conn = pool.get(key)
+    if conn is None:
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        if proxy is None:
+            conn = conn_cls(netloc, timeout=timeout)
+        else:
+            proxy_port = proxy.port or (443 if proxy.scheme == "https" else 80)
+            conn = conn_cls(proxy.hostname, proxy_port, timeout=timeout)
+            if scheme == "https":
+                conn.set_tunnel(netloc, headers=proxy_headers)
+        pool[key] = conn
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn, (proxy_headers if proxy is not None and scheme == "http" else None)
+
+
+@functools.lru_cache(maxsize=16)
+def _basic_auth_header(username: str, password: str) -> str:
+    """Build (once per credential pair) an HTTP Basic Authorization value."""
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return f"Basic {token}"
+
+
+def _http_request(
+    method: str,
     url: str,
-    data: Optional[Dict[str, Any]] = None,
-    headers: Optional[Dict[str, str]] = None,
-    timeout: int = 10
+    body: Optional[bytes],
+    headers: Dict[str, str],
+    timeout: int,
+    auth: Optional[Tuple[str, str]] = None
 ) -> Dict[str, Any]:
     """
-    Make an HTTP POST request with JSON body.
+    Send a request over a pooled keep-alive connection.
+
+    Proxies are honoured as urllib does (HTTP(S)_PROXY / NO_PROXY). If an
+    idempotent request fails because the server closed a reused connection,
+    it is retried once on a fresh connection. Redirects are not followed.
 
     Returns:
         Dict with success, status_code, body, error
     """
-    body_bytes = json.dumps(data or {}).encode("utf-8")
-
-    req = urllib.request.Request(url, data=body_bytes, method="POST")
-    req.add_header("Content-Type", "application/json")
-    if headers:
-        for key, value in headers.items():
-            req.add_header(key, value)
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return {
+            "success": False,
+            "status_code": None,
+            "body": None,
+            "error": f"unsupported URL scheme: {parts.scheme!r}"
+        }
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    headers = {"User-Agent": "platform-kit-audit", **headers}
+    if auth:
+        headers["Authorization"] = _basic_auth_header(*auth)
+
+    for attempt in range(2):
+        conn, forward_headers = _get_connection(parts.scheme, parts.netloc, timeout)
+        reused = conn.sock is not None
+        try:
+            if forward_headers is None:
+                conn.request(method, path, body=body, headers=headers)
+            else:
+                conn.request(method, urllib.parse.urlunsplit(parts._replace(fragment="")),
+                             body=body, headers={**headers, **forward_headers})
+            resp = conn.getresponse()
+            resp_body = resp.read().decode("utf-8")
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+            conn.close()
+            if reused and attempt == 0 and method in _IDEMPOTENT_METHODS:
+                continue
+            return {
+                "success": False,
+                "status_code": None,
+                "body": None,
+                "error": str(e)
+            }
+        except Exception as e:
+            conn.close()
+            return {
+                "success": False,
+                "status_code": None,
+                "body": None,
+                "error": str(e)
+            }
 
-    try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            body = resp.read().decode("utf-8")
+        if 200 <= resp.status < 300:
             return {
                 "success": True,
                 "status_code": resp.status,
-                "body": body,
+                "body": resp_body,
                 "headers": dict(resp.headers)
             }
-    except urllib.error.HTTPError as e:
         return {
             "success": False,
-            "status_code": e.code,
-            "body": e.read().decode("utf-8") if e.fp else None,
-            "error": str(e)
-        }
-    except urllib.error.URLError as e:
-        return {
-            "success": False,
-            "status_code": None,
-            "body": None,
-            "error": str(e.reason)
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "status_code": None,
-            "body": None,
-            "error": str(e)
+            "status_code": resp.status,
+            "body": resp_body,
+            "error": f"HTTP Error {resp.status}: {resp.reason}"
         }
 
 
+def http_get(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = 10,
+    auth: Optional[Tuple[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Make an HTTP GET request.
+
+    Redirects are not followed: a 3xx response is returned as-is with
+    success False.
+
+    Args:
+        auth: Optional (username, password) for HTTP Basic auth
+
+    Returns:
+        Dict with success, status_code, body, error
+    """
+    return _http_request("GET", url, None, headers or {}, timeout, auth)
+
+
+def http_post(
+    url: str,
+    data: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = 10,
+    auth: Optional[Tuple[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Make an HTTP POST request with JSON body.
+
+    Args:
+        auth: Optional (username, password) for HTTP Basic auth
+
+    Returns:
+        Dict with success, status_code, body, error
+    """
+    body_bytes = json.dumps(data or {}).encode("utf-8")
+    return _http_request(
+        "POST",
+        url,
+        body_bytes,
+        {"Content-Type": "application/json", **(headers or {})},
+        timeout,
+        auth
+    )
+
+
 # =============================================================================
 # DNS Helpers
 # =============================================================================
 
-def dig_txt(name: str) -> str:
-    """Query TXT records for a domain using dig."""
-    r = run_cmd(["dig", "+short", "TXT", name])
-    if not r["success"]:
+# Seconds to cache DNS answers in-process (0 disables caching)
+DNS_CACHE_TTL = get_env_float("AUDIT_DNS_TTL", 300)
+
+_dns_cache: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_resolver = None
+
+
+def _get_resolver() -> Optional[Any]:
+    """Return a shared dnspython resolver, or None if dnspython is unavailable."""
+    global _resolver
+    if _resolver is None and dns is not None:
+        try:
+            _resolver = dns.resolver.Resolver()
+            _resolver.lifetime = 5
+        except dns.exception.DNSException:
+            return None
+    return _resolver
+
+
+def _resolve(rtype: str, name: str) -> Optional[str]:
+    """
+    Query records in-process with dnspython, formatted like `dig +short`.
+
+    Returns None if the lookup itself failed (timeout, no nameservers).
+    """
+    try:
+        answer = _get_resolver().resolve(name, rtype)
+    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
         return ""
+    except dns.exception.DNSException:
+        return None
+
+    if rtype == "TXT":
+        records = [b"".join(rr.strings).decode("utf-8", "replace") for rr in answer]
+    else:
+        records = [rr.to_text() for rr in answer]
+    return "\n".join(records)
+
+
+def _dig(rtype: str, name: str) -> str:
+    """Query records of a given type, caching successful answers."""
+    key = (rtype, name)
+    cached = _dns_cache.get(key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    if _get_resolver() is not None:
+        value = _resolve(rtype, name)
+        if value is None:
+            return ""
+    else:
+        r = run_cmd(["dig", "+short", rtype, name])
+        if not r["success"]:
+            return ""
+        value = (r.get("stdout") or "").strip()
+
+    if DNS_CACHE_TTL > 0:
+        _dns_cache[key] = (value, time.monotonic() + DNS_CACHE_TTL)
+    return value
+
+
+def dig_txt(name: str) -> str:
+    """Query TXT records for a domain (dnspython if available, else dig)."""
     # Remove quotes from TXT records
-    return (r.get("stdout") or "").replace('"', '').strip()
+    return _dig("TXT", name).replace('"', '').strip()
 
 
 def dig_mx(name: str) -> str:
-    """Query MX records for a domain using dig."""
-    r = run_cmd(["dig", "+short", "MX", name])
-    if not r["success"]:
-        return ""
-    return (r.get("stdout") or "").strip()
+    """Query MX records for a domain (dnspython if available, else dig)."""
+    return _dig("MX", name)
 
 
 def dig_cname(name: str) -> str:
-    """Query CNAME records for a domain using dig."""
-    r = run_cmd(["dig", "+short", "CNAME", name])
-    if not r["success"]:
-        return ""
-    return (r.get("stdout") or "").strip()
+    """Query CNAME records for a domain (dnspython if available, else dig)."""
+    return _dig("CNAME", name)
 
 
 def dig_a(name: str) -> str:
-    """Query A records for a domain using dig."""
-    r = run_cmd(["dig", "+short", "A", name])
-    if not r["success"]:
-        return ""
-    return (r.get("stdout") or "").strip()
+    """Query A records for a domain (dnspython if available, else dig)."""
+    return _dig("A", name)
 
 
 # =============================================================================
 # Validation Helpers
 # =============================================================================
 
+# Anchored with \Z rather than $, which would also accept a trailing newline;
+# no character class admits whitespace, so any whitespace is rejected.
+_URL_RE = re.compile(
+    r'^https?://'
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
+    r'localhost|'
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+    r'(?::\d+)?'
+    r'(?:/?|[/?]\S+)\Z', re.IGNORECASE
+)
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\Z')
+_DOMAIN_RE = re.compile(
+    r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\Z'
+)
+
+
+# Cheap literal/length checks run first so malformed or oversized input never
+# reaches the backtracking regex engine.
+
 def validate_url(url: str) -> bool:
     """Check if a string is a valid URL."""
-    pattern = re.compile(
-        r'^https?://'
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
-        r'localhost|'
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-        r'(?::\d+)?'
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE
+    return (
+        url[:8].lower().startswith(("http://", "https://"))
+        and _URL_RE.match(url) is not None
     )
-    return bool(pattern.match(url))
 
 
 def validate_email(email: str) -> bool:
-    """Check if a string is a valid email address."""
-    pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
-    return bool(pattern.match(email))
+    """Check if a string is a valid email address (RFC 5321 length limits)."""
+    return (
+        6 <= len(email) <= 254
+        and 0 < email.find("@") <= 64
+        and _EMAIL_RE.match(email) is not None
+    )
 
 
 def validate_domain(domain: str) -> bool:
-    """Check if a string is a valid domain name."""
-    pattern = re.compile(
-        r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$'
+    """Check if a string is a valid domain name (at most 253 characters)."""
+    return (
+        4 <= len(domain) <= 253
+        and "." in domain
+        and _DOMAIN_RE.match(domain) is not None
     )
-    return bool(pattern.match(domain))
@@ -0,0 +1,81 @@
+"""
+Integration Audit Driver
+
+Runs every integration check in a single Python process and prints the
+results as one JSON array. Interpreter startup and imports are paid once,
+and the DNS answer cache in scripts.audit.lib is shared across checks
+(HTTP connection pools are per thread, so each check keeps its own).
+Checks run concurrently so that DNS/network-bound checks overlap with the
+repository scan.
+
+Usage:
+    python -m scripts.audit.run_all [NAME ...]
+
+NAME selects checks by integration name (default: all). Unknown names are
+rejected with exit code 2.
+
+Each check module keeps its own __main__ for one-off use.
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add repository root to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, REPO_ROOT)
+
+from scripts.audit.checks import check_domain_policy, check_mailgun
+
+
+# (integration name, check module, blocking) in report order
+CHECKS = [
+    ("policy", check_domain_policy, True),
+    ("mailgun", check_mailgun, False),
+]
+
+
+def _run_check(name, module):
+    """Run one check, converting an unexpected exception into an error result."""
+    try:
+        return {"integration": name, **module.run()}
+    except Exception as e:
+        return {"integration": name, "status": "error", "error": str(e)}
+
+
+def run_all(names=None):
+    """
+    Run the selected checks (all by default) concurrently.
+
+    Returns:
+        List of results in CHECKS order, each tagged with its integration name
+
+    Raises:
+        ValueError: if a name does not match any check in CHECKS
+    """
+    unknown = set(names or ()) - {n for n, _, _ in CHECKS}
+    if unknown:
+        raise ValueError(f"unknown check(s): {', '.join(sorted(unknown))}")
+    selected = [(n, m) for n, m, _ in CHECKS if not names or n in names]
+    with ThreadPoolExecutor(max_workers=len(selected) or 1) as pool:
+        return list(pool.map(lambda check: _run_check(*check), selected))
+
+
+if __name__ == "__main__":
+    # Checks scan and resolve paths relative to the repository root
+    os.chdir(REPO_ROOT)
+
+    try:
+        results = run_all(sys.argv[1:])
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        print(f"Usage: python -m scripts.audit.run_all [{' | '.join(n for n, _, _ in CHECKS)} ...]",
+              file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(results, indent=2))
+
+    blocking = {n for n, _, b in CHECKS if b}
+    failed = [r for r in results
+              if r["integration"] in blocking and r.get("status") in ("fail", "error")]
+    sys.exit(1 if failed else 0)
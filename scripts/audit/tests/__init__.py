@@ -0,0 +1 @@
+# Integration Audit Tests